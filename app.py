@@ -7,7 +7,15 @@ from bokeh.models import Button, CustomJS
 from streamlit_bokeh_events import streamlit_bokeh_events
 from streamlit.components.v1 import html
 
-from mqtt_client import MQTTClient, TOPIC_LIGHTS_CMD, TOPIC_SERVO_CMD
+from mqtt_client import (
+    MQTTClient,
+    TOPIC_LIGHTS_CMD,
+    TOPIC_SERVO_CMD,
+    STATE_CONNECTED,
+    STATE_CONNECTING,
+    STATE_RECONNECTING,
+    STATE_DISCONNECTED,
+)
 
 
 st.set_page_config(page_title="Control Casa Inteligente", layout="wide")
@@ -278,11 +286,11 @@ def mqtt_message_consumer():
 
 def publish_light_cmd(client, on_or_off: str):
     payload = {"cmd": "power", "value": on_or_off}
-    client.publish_json(TOPIC_LIGHTS_CMD, payload)
+    return client.publish_json(TOPIC_LIGHTS_CMD, payload)
 
 def publish_servo_cmd(client, angle: int):
     payload = {"angle": angle}
-    client.publish_json(TOPIC_SERVO_CMD, payload)
+    return client.publish_json(TOPIC_SERVO_CMD, payload)
 
 
 def voice_bokeh_button(event_name: str, comp_id: str, label: str = "Iniciar reconocimiento"):
@@ -383,25 +391,29 @@ if page == "Luz":
 
     with col1:
         if st.button("Activar LED (enviar ON)"):
-            publish_light_cmd(client, "on")
-            st.session_state["light_state"] = "on"
-            st.session_state["last_lights_state_raw"] = json.dumps({
-                "ts": int(time.time() * 1000),
-                "device": "esp32-01",
-                "data": {"power": "on"}
-            }, ensure_ascii=False)
-            st.success("Comando enviado: encender")
+            if publish_light_cmd(client, "on"):
+                st.session_state["light_state"] = "on"
+                st.session_state["last_lights_state_raw"] = json.dumps({
+                    "ts": int(time.time() * 1000),
+                    "device": "esp32-01",
+                    "data": {"power": "on"}
+                }, ensure_ascii=False)
+                st.success("Comando enviado: encender")
+            else:
+                st.warning("Sin conexión: comando en cola (encender)")
 
     with col2:
         if st.button("Desactivar LED (enviar OFF)"):
-            publish_light_cmd(client, "off")
-            st.session_state["light_state"] = "off"
-            st.session_state["last_lights_state_raw"] = json.dumps({
-                "ts": int(time.time() * 1000),
-                "device": "esp32-01",
-                "data": {"power": "off"}
-            }, ensure_ascii=False)
-            st.success("Comando enviado: apagar")
+            if publish_light_cmd(client, "off"):
+                st.session_state["light_state"] = "off"
+                st.session_state["last_lights_state_raw"] = json.dumps({
+                    "ts": int(time.time() * 1000),
+                    "device": "esp32-01",
+                    "data": {"power": "off"}
+                }, ensure_ascii=False)
+                st.success("Comando enviado: apagar")
+            else:
+                st.warning("Sin conexión: comando en cola (apagar)")
 
     st.write("---")
     st.write("Reconocimiento por voz (Bokeh). Pulsa 'Iniciar reconocimiento' y habla en español (Chrome/Edge recom.)")
@@ -426,23 +438,27 @@ if page == "Luz":
             txt = payload.get("text", "").lower()
             st.write("Reconocido:", txt)
             if "encender" in txt:
-                publish_light_cmd(client, "on")
-                st.session_state["light_state"] = "on"
-                st.session_state["last_lights_state_raw"] = json.dumps({
-                    "ts": int(time.time() * 1000),
-                    "device": "esp32-01",
-                    "data": {"power": "on"}
-                }, ensure_ascii=False)
-                st.success("Comando enviado: encender")
+                if publish_light_cmd(client, "on"):
+                    st.session_state["light_state"] = "on"
+                    st.session_state["last_lights_state_raw"] = json.dumps({
+                        "ts": int(time.time() * 1000),
+                        "device": "esp32-01",
+                        "data": {"power": "on"}
+                    }, ensure_ascii=False)
+                    st.success("Comando enviado: encender")
+                else:
+                    st.warning("Sin conexión: comando en cola (encender)")
             elif "apagar" in txt:
-                publish_light_cmd(client, "off")
-                st.session_state["light_state"] = "off"
-                st.session_state["last_lights_state_raw"] = json.dumps({
-                    "ts": int(time.time() * 1000),
-                    "device": "esp32-01",
-                    "data": {"power": "off"}
-                }, ensure_ascii=False)
-                st.success("Comando enviado: apagar")
+                if publish_light_cmd(client, "off"):
+                    st.session_state["light_state"] = "off"
+                    st.session_state["last_lights_state_raw"] = json.dumps({
+                        "ts": int(time.time() * 1000),
+                        "device": "esp32-01",
+                        "data": {"power": "off"}
+                    }, ensure_ascii=False)
+                    st.success("Comando enviado: apagar")
+                else:
+                    st.warning("Sin conexión: comando en cola (apagar)")
             else:
                 st.warning("No se reconoció 'encender' ni 'apagar' en el texto.")
         elif payload.get("error"):
@@ -510,8 +526,10 @@ elif page == "Sensores":
     st.write("---")
     st.write("Control de la Ventilación")
     if st.button("Activar Ventilación"):
-        publish_servo_cmd(client, 90)
-        st.success("Comando servo enviado: 90°")
+        if publish_servo_cmd(client, 90):
+            st.success("Comando servo enviado: 90°")
+        else:
+            st.warning("Sin conexión: comando en cola (servo 90°)")
 
 # --- PÁGINA SEGURIDAD ---
 elif page == "Seguridad":
@@ -581,8 +599,10 @@ elif page == "Seguridad":
             txt = payload.get("text", "").lower()
             st.write("Reconocido:", txt)
             if "seguridad" in txt:
-                publish_servo_cmd(client, 110)
-                st.success("Comando enviado: mover servo a 110°")
+                if publish_servo_cmd(client, 110):
+                    st.success("Comando enviado: mover servo a 110°")
+                else:
+                    st.warning("Sin conexión: comando en cola (servo 110°)")
             else:
                 st.warning("No se reconoció la palabra 'seguridad' en el texto.")
         elif payload.get("error"):
@@ -591,6 +611,17 @@ elif page == "Seguridad":
 # Footer / sidebar info
 st.sidebar.write("MQTT broker:")
 st.sidebar.write(f"{client.broker}:{client.port}")
+# Estado de la conexión y comandos pendientes en el outbox
+CONNECTION_LABELS = {
+    STATE_CONNECTED: "🟢 Conectado",
+    STATE_CONNECTING: "🟡 Conectando...",
+    STATE_RECONNECTING: "🟠 Reconectando...",
+    STATE_DISCONNECTED: "🔴 Desconectado",
+}
+st.sidebar.write("Estado de conexión:")
+st.sidebar.write(CONNECTION_LABELS.get(client.state, client.state))
+if client.pending_count:
+    st.sidebar.write(f"Comandos pendientes de envío: {client.pending_count}")
 st.sidebar.write("Último client id (si disponible):")
 try:
     cid = client.client._client_id.decode() if hasattr(client.client, '_client_id') else ""
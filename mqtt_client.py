@@ -1,6 +1,10 @@
 import json
+import math
+import os
+import random
 import threading
 import time
+from collections import deque
 from queue import Queue
 
 import paho.mqtt.client as mqtt
@@ -17,6 +21,147 @@ TOPIC_SERVO_STATE = f"{BASE_TOPIC}/servo/state"
 TOPIC_SECURITY_EVENT = f"{BASE_TOPIC}/security/event"
 TOPIC_SECURITY_CMD = f"{BASE_TOPIC}/security/cmd"
 
+# All state topics, resubscribed together in a single SUBSCRIBE packet on every connect.
+SUBSCRIBE_TOPICS = [
+    (TOPIC_LIGHTS_STATE, 0),
+    (TOPIC_TEMP_TELE, 0),
+    (TOPIC_SERVO_STATE, 0),
+    (TOPIC_SECURITY_EVENT, 0),
+]
+
+STATE_DISCONNECTED = "disconnected"
+STATE_CONNECTING = "connecting"
+STATE_CONNECTED = "connected"
+STATE_RECONNECTING = "reconnecting"
+
+RECONNECT_MIN_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+
+OUTBOX_PATH = "mqtt_outbox.json"
+OUTBOX_MAX_LEN = 100
+# Commands older than this (seconds) are dropped instead of being replayed late.
+OUTBOX_MAX_AGE = 300
+
+# Past this exponent the delay is already at RECONNECT_MAX_DELAY.
+_MAX_BACKOFF_EXPONENT = math.ceil(math.log2(RECONNECT_MAX_DELAY / RECONNECT_MIN_DELAY))
+
+
+def reconnect_delay(attempt):
+    """Jittered exponential backoff for the given 0-based reconnect attempt."""
+    # Equal jitter: half of the exponential delay is fixed, the other half random,
+    # so many clients restarting together do not hit the broker in lockstep.
+    exponent = min(attempt, _MAX_BACKOFF_EXPONENT)
+    cap = min(RECONNECT_MAX_DELAY, RECONNECT_MIN_DELAY * (2 ** exponent))
+    return cap / 2 + random.uniform(0, cap / 2)
+
+
+class Outbox:
+    """
+    Bounded FIFO of commands that could not be published, persisted to a JSON file.
+
+    There is a single Outbox per file in the process (see get_outbox), so several
+    MQTTClient instances — one per Streamlit session — share it instead of each one
+    loading and replaying the same commands.
+    """
+    def __init__(self, path=OUTBOX_PATH, max_len=OUTBOX_MAX_LEN):
+        self.path = path
+        # Reentrant so publish_raw can hold it around a publish + flush.
+        self.lock = threading.RLock()
+        self._items = deque(self._load(), maxlen=max_len)
+
+    def __len__(self):
+        return len(self._items)
+
+    def append(self, topic, payload_str, retain=False):
+        with self.lock:
+            if len(self._items) == self._items.maxlen:
+                print("MQTT outbox full, dropping oldest command:", self._items[0]["topic"])
+            self._items.append({"topic": topic, "payload": payload_str, "retain": retain,
+                                "ts": time.time()})
+            self._save()
+
+    def flush(self, publish):
+        """Send queued commands in order with publish(topic, payload, retain) -> bool.
+
+        Stops at the first failure so the remaining commands keep their order.
+        Expired commands are discarded rather than sent.
+        """
+        with self.lock:
+            if not self._items:
+                return 0
+            sent = 0
+            while self._items:
+                item = self._items[0]
+                if _is_expired(item):
+                    print("MQTT outbox dropping expired command:", item["topic"])
+                    self._items.popleft()
+                    continue
+                if not publish(item["topic"], item["payload"], item.get("retain", False)):
+                    break
+                self._items.popleft()
+                sent += 1
+            print(f"MQTT outbox flushed {sent} command(s), {len(self._items)} pending")
+            self._save()
+            return sent
+
+    def items(self):
+        with self.lock:
+            return list(self._items)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except Exception as e:
+            print("MQTT outbox load error:", e)
+            return []
+        if not isinstance(items, list):
+            return []
+        return [i for i in items
+                if isinstance(i, dict) and "topic" in i and "payload" in i and not _is_expired(i)]
+
+    def _save(self):
+        if not self.path:
+            return
+        # Write to a temp file and swap it in so a crash never leaves a half-written outbox.
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(self._items), f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print("MQTT outbox save error:", e)
+
+
+def _is_expired(item):
+    ts = item.get("ts")
+    if not isinstance(ts, (int, float)):
+        return True
+    return time.time() - ts > OUTBOX_MAX_AGE
+
+
+_outboxes = {}
+_outboxes_lock = threading.Lock()
+
+
+def get_outbox(path=OUTBOX_PATH):
+    """Return the process-wide Outbox for path, creating (and loading) it once.
+
+    The size limit is the module-level OUTBOX_MAX_LEN, so every client sharing a
+    file also shares the same bound.
+    """
+    key = os.path.abspath(path) if path else None
+    with _outboxes_lock:
+        outbox = _outboxes.get(key) if key else None
+        if outbox is None:
+            outbox = Outbox(path, OUTBOX_MAX_LEN)
+            if key:
+                _outboxes[key] = outbox
+        return outbox
+
+
 class MQTTClient:
     """
     Simple wrapper around paho-mqtt that publishes/subscribes and pushes parsed messages
@@ -24,35 +169,43 @@ class MQTTClient:
 
     The on_message always puts a 3-tuple (topic, parsed_obj_or_None, raw_payload_str)
     so app.py can rely on the shape — but app.py will also accept older 2-tuples if present.
+
+    paho's threaded loop handles reconnecting; the wait before each attempt is set to a
+    jittered exponential delay from on_disconnect/on_connect_fail. Publishes issued while
+    offline go to the shared Outbox and are flushed in order once the broker accepts
+    the connection.
     """
-    def __init__(self, broker=MQTT_BROKER, port=MQTT_PORT, queue: Queue = None):
+    def __init__(self, broker=MQTT_BROKER, port=MQTT_PORT, queue: Queue = None,
+                 outbox_path=OUTBOX_PATH):
         self.client = mqtt.Client()
         self.broker = broker
         self.port = port
         self.queue = queue or Queue()
-        self._thread = None
+        self._started = False
         self._stop_event = threading.Event()
 
-      
+        self.state = STATE_DISCONNECTED
+        self._attempt = 0
+        self.outbox = get_outbox(outbox_path)
+
+        self.client.reconnect_delay_set(min_delay=RECONNECT_MIN_DELAY, max_delay=RECONNECT_MAX_DELAY)
         self.client.on_connect = self._on_connect
+        self.client.on_connect_fail = self._on_connect_fail
+        self.client.on_disconnect = self._on_disconnect
         self.client.on_message = self._on_message
 
+    @property
+    def pending_count(self):
+        return len(self.outbox)
+
     def start(self):
-        if self._thread and self._thread.is_alive():
+        if self._started:
             return
+        self._started = True
         self._stop_event.clear()
-        self._thread = threading.Thread(target=self._run, daemon=True)
-        self._thread.start()
-
-    def _run(self):
-        try:
-            self.client.connect(self.broker, self.port, keepalive=60)
-        except Exception as e:
-            print("MQTT connect error:", e)
+        self.state = STATE_CONNECTING
+        self.client.connect_async(self.broker, self.port, keepalive=60)
         self.client.loop_start()
-        while not self._stop_event.is_set():
-            time.sleep(0.1)
-        self.client.loop_stop()
 
     def stop(self):
         self._stop_event.set()
@@ -60,14 +213,40 @@ class MQTTClient:
             self.client.disconnect()
         except Exception:
             pass
+        self.client.loop_stop()
+        self._started = False
+        self.state = STATE_DISCONNECTED
+
+    def _schedule_reconnect(self):
+        # paho waits reconnect_delay before its next attempt; pinning min == max makes
+        # that wait exactly our jittered delay instead of paho's plain doubling.
+        delay = reconnect_delay(self._attempt)
+        self._attempt += 1
+        self.client.reconnect_delay_set(min_delay=delay, max_delay=delay)
+        self.state = STATE_RECONNECTING
+        print(f"MQTT reconnecting in {delay:.1f}s (attempt {self._attempt})")
 
     def _on_connect(self, client, userdata, flags, rc):
         print("MQTT connected, rc=", rc)
-        
-        client.subscribe(TOPIC_LIGHTS_STATE)
-        client.subscribe(TOPIC_TEMP_TELE)
-        client.subscribe(TOPIC_SERVO_STATE)
-        client.subscribe(TOPIC_SECURITY_EVENT)
+        if rc != 0:
+            return
+        self._attempt = 0
+        client.reconnect_delay_set(min_delay=RECONNECT_MIN_DELAY, max_delay=RECONNECT_MAX_DELAY)
+        client.subscribe(SUBSCRIBE_TOPICS)
+        self.state = STATE_CONNECTED
+        self.outbox.flush(self._try_publish)
+
+    def _on_connect_fail(self, client, userdata):
+        print("MQTT connect error")
+        if not self._stop_event.is_set():
+            self._schedule_reconnect()
+
+    def _on_disconnect(self, client, userdata, rc):
+        print("MQTT disconnected, rc=", rc)
+        if self._stop_event.is_set():
+            self.state = STATE_DISCONNECTED
+        else:
+            self._schedule_reconnect()
 
     def _on_message(self, client, userdata, msg):
         topic = msg.topic
@@ -87,7 +266,28 @@ class MQTTClient:
 
     def publish_json(self, topic, payload_dict, retain=False):
         payload = json.dumps(payload_dict)
-        self.client.publish(topic, payload, retain=retain)
+        return self.publish_raw(topic, payload, retain=retain)
 
     def publish_raw(self, topic, payload_str, retain=False):
-        self.client.publish(topic, payload_str, retain=retain)
+        """Publish now if possible, otherwise queue in the outbox.
+
+        Returns True if the command was handed to paho, False if it is only queued.
+        """
+        with self.outbox.lock:
+            # Anything already waiting goes first so commands keep their order.
+            if self.state == STATE_CONNECTED and not len(self.outbox):
+                if self._try_publish(topic, payload_str, retain):
+                    return True
+            self.outbox.append(topic, payload_str, retain)
+            if self.state == STATE_CONNECTED:
+                self.outbox.flush(self._try_publish)
+            # The new command is last, so it was sent only if the outbox drained.
+            return not len(self.outbox)
+
+    def _try_publish(self, topic, payload_str, retain):
+        try:
+            info = self.client.publish(topic, payload_str, retain=retain)
+        except Exception as e:
+            print("MQTT publish error:", e)
+            return False
+        return info.rc == mqtt.MQTT_ERR_SUCCESS
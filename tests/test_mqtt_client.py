@@ -0,0 +1,178 @@
+import json
+import time
+
+import pytest
+
+import mqtt_client
+from mqtt_client import (
+    MQTTClient,
+    STATE_CONNECTED,
+    STATE_RECONNECTING,
+    SUBSCRIBE_TOPICS,
+    RECONNECT_MAX_DELAY,
+    RECONNECT_MIN_DELAY,
+)
+
+
+class FakeInfo:
+    def __init__(self, rc):
+        self.rc = rc
+
+
+class FakeClient:
+    """Stand-in for paho's Client that records calls instead of touching the network."""
+    def __init__(self, *args, **kwargs):
+        self.published = []
+        self.subscribed = []
+        self.delays = []
+        self.fail_publish = False
+
+    def reconnect_delay_set(self, min_delay=1, max_delay=120):
+        self.delays.append((min_delay, max_delay))
+
+    def subscribe(self, topics):
+        self.subscribed.append(topics)
+
+    def publish(self, topic, payload, retain=False):
+        if self.fail_publish:
+            return FakeInfo(mqtt_client.mqtt.MQTT_ERR_NO_CONN)
+        self.published.append((topic, payload, retain))
+        return FakeInfo(mqtt_client.mqtt.MQTT_ERR_SUCCESS)
+
+
+@pytest.fixture
+def outbox_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(mqtt_client.mqtt, "Client", FakeClient)
+    monkeypatch.setattr(mqtt_client, "_outboxes", {})
+    return str(tmp_path / "mqtt_outbox.json")
+
+
+def test_reconnect_delay_is_bounded_and_jittered():
+    for attempt in range(12):
+        cap = min(RECONNECT_MAX_DELAY, RECONNECT_MIN_DELAY * (2 ** attempt))
+        delays = {mqtt_client.reconnect_delay(attempt) for _ in range(20)}
+        assert all(cap / 2 <= d <= cap for d in delays)
+        assert len(delays) > 1
+
+
+def test_reconnect_delay_is_capped_for_long_outages():
+    delay = mqtt_client.reconnect_delay(10_000)
+    assert RECONNECT_MAX_DELAY / 2 <= delay <= RECONNECT_MAX_DELAY
+
+
+def test_offline_publish_is_persisted_and_flushed_in_order(outbox_path):
+    c = MQTTClient(outbox_path=outbox_path)
+    assert c.publish_json("a", {"n": 1}) is False
+    assert c.publish_json("b", {"n": 2}) is False
+
+    assert c.client.published == []
+    with open(outbox_path, encoding="utf-8") as f:
+        assert [i["topic"] for i in json.load(f)] == ["a", "b"]
+
+    c._on_connect(c.client, None, {}, 0)
+
+    assert c.state == STATE_CONNECTED
+    assert c.client.subscribed == [SUBSCRIBE_TOPICS]
+    assert [t for t, _, _ in c.client.published] == ["a", "b"]
+    assert c.pending_count == 0
+    with open(outbox_path, encoding="utf-8") as f:
+        assert json.load(f) == []
+    assert c.publish_json("c", {"n": 3}) is True
+
+
+def test_outbox_drops_oldest_when_full(outbox_path, monkeypatch):
+    monkeypatch.setattr(mqtt_client, "OUTBOX_MAX_LEN", 2)
+    c = MQTTClient(outbox_path=outbox_path)
+    for topic in ("a", "b", "c"):
+        c.publish_raw(topic, "x")
+    assert [i["topic"] for i in c.outbox.items()] == ["b", "c"]
+
+
+def test_failed_flush_is_retried_on_next_publish(outbox_path):
+    c = MQTTClient(outbox_path=outbox_path)
+    c.publish_raw("a", "1")
+    c.client.fail_publish = True
+    c._on_connect(c.client, None, {}, 0)
+    assert c.pending_count == 1
+
+    c.client.fail_publish = False
+    assert c.publish_raw("b", "2") is True
+
+    assert [t for t, _, _ in c.client.published] == ["a", "b"]
+    assert c.pending_count == 0
+
+
+def test_clients_share_one_outbox_per_file(outbox_path):
+    first = MQTTClient(outbox_path=outbox_path)
+    first.publish_raw("a", "1")
+    second = MQTTClient(outbox_path=outbox_path)
+
+    assert second.outbox is first.outbox
+    second._on_connect(second.client, None, {}, 0)
+    first._on_connect(first.client, None, {}, 0)
+
+    assert second.client.published == [("a", "1", False)]
+    assert first.client.published == []
+
+
+def test_disconnect_schedules_jittered_reconnect(outbox_path):
+    c = MQTTClient(outbox_path=outbox_path)
+    c._on_disconnect(c.client, None, 1)
+    c._on_connect_fail(c.client, None)
+
+    assert c.state == STATE_RECONNECTING
+    first, second = c.client.delays[-2:]
+    assert first[0] == first[1] and RECONNECT_MIN_DELAY / 2 <= first[0] <= RECONNECT_MIN_DELAY
+    assert RECONNECT_MIN_DELAY <= second[0] <= 2 * RECONNECT_MIN_DELAY
+
+    c._on_connect(c.client, None, {}, 0)
+    assert c.client.delays[-1] == (RECONNECT_MIN_DELAY, RECONNECT_MAX_DELAY)
+
+
+def test_expired_commands_are_dropped_on_flush(outbox_path, monkeypatch):
+    c = MQTTClient(outbox_path=outbox_path)
+    c.publish_raw("old", "1")
+    c.publish_raw("new", "2")
+    c.outbox._items[0]["ts"] -= mqtt_client.OUTBOX_MAX_AGE + 1
+
+    c._on_connect(c.client, None, {}, 0)
+
+    assert [t for t, _, _ in c.client.published] == ["new"]
+    assert c.pending_count == 0
+
+
+def test_expired_commands_are_dropped_on_load(outbox_path):
+    now = time.time()
+    items = [
+        {"topic": "old", "payload": "1", "retain": False, "ts": now - mqtt_client.OUTBOX_MAX_AGE - 1},
+        {"topic": "new", "payload": "2", "retain": False, "ts": now},
+    ]
+    with open(outbox_path, "w", encoding="utf-8") as f:
+        json.dump(items, f)
+
+    c = MQTTClient(outbox_path=outbox_path)
+    assert [i["topic"] for i in c.outbox.items()] == ["new"]
+
+
+@pytest.mark.parametrize("content", [
+    None,
+    "{not json",
+    '{"topic": "a"}',
+    '[1, {"topic": "a"}]',
+    '[{"topic": "a", "payload": "1"}]',
+])
+def test_missing_or_corrupt_outbox_file_loads_empty(outbox_path, content):
+    if content is not None:
+        with open(outbox_path, "w", encoding="utf-8") as f:
+            f.write(content)
+    c = MQTTClient(outbox_path=outbox_path)
+    assert c.pending_count == 0
+
+
+def test_outbox_file_is_reloaded_on_restart(outbox_path):
+    MQTTClient(outbox_path=outbox_path).publish_raw("a", "1", retain=True)
+    mqtt_client._outboxes.clear()
+
+    c = MQTTClient(outbox_path=outbox_path)
+    [item] = c.outbox.items()
+    assert (item["topic"], item["payload"], item["retain"]) == ("a", "1", True)